@@ -1,5 +1,6 @@
 from flask import Flask, request, jsonify
 import os
+import sys
 from dotenv import load_dotenv
 from routes import api
 import logging
@@ -17,6 +18,11 @@ logger = logging.getLogger(__name__)
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
 
+# The kubernetes client logs every request at DEBUG; keep that out of production
+logging.getLogger('kubernetes').setLevel(
+    logging.WARNING if os.getenv('ENVIRONMENT') == 'production' else logging.DEBUG
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 
@@ -27,7 +33,7 @@ app.register_blueprint(api)
 def start_server():
     """Start a new game server instance"""
     logger.info("=== Start Server Request Received ===")
-    logger.info(f"Environment: {os.getenv('ENVIRONMENT', 'Not Set')}")
+    logger.info("Environment: %s", os.getenv('ENVIRONMENT', 'Not Set'))
     
     try:
         # Validate request data
@@ -46,18 +52,18 @@ def start_server():
             
         # Validate package
         if package not in GAME_PACKAGES:
-            logger.error(f"Invalid package: {package}")
+            logger.error("Invalid package: %s", package)
             return jsonify({"error": f"Invalid package: {package}"}), 400
             
         # Get package configuration
         config = GAME_PACKAGES[package]
-        logger.info(f"Using package configuration: {config}")
+        logger.info("Using package configuration: %s", config)
             
         # Initialize Kubernetes service
         try:
-            k8s_service = KubernetesService()
+            k8s_service = KubernetesService.get_instance()
         except Exception as k8s_error:
-            logger.error(f"Failed to initialize Kubernetes service: {str(k8s_error)}")
+            logger.error("Failed to initialize Kubernetes service: %s", k8s_error)
             return jsonify({
                 "error": "Failed to connect to Kubernetes cluster",
                 "details": str(k8s_error)
@@ -65,26 +71,33 @@ def start_server():
         
         # Test Kubernetes connection
         try:
-            namespaces = k8s_service.core_v1.list_namespace()
-            logger.info(f"Connected to cluster. Found {len(namespaces.items)} namespaces")
+            # A single item served from the apiserver watch cache is enough to prove
+            # connectivity; the total comes from remaining_item_count
+            namespaces = k8s_service.core_api.list_namespace(
+                limit=1,
+                resource_version="0",
+                resource_version_match="NotOlderThan"
+            )
+            namespace_count = len(namespaces.items) + (namespaces.metadata.remaining_item_count or 0)
+            logger.info("Connected to cluster. Found %d namespaces", namespace_count)
             
             return jsonify({
                 "message": f"Server {server_id} for package {package} is starting...",
                 "namespace": namespace,
                 "config": config,
-                "namespace_count": len(namespaces.items),
+                "namespace_count": namespace_count,
                 "environment": "production" if os.getenv('ENVIRONMENT') == 'production' else "development"
             }), 200
             
         except Exception as namespace_error:
-            logger.error(f"Failed to list namespaces: {str(namespace_error)}")
+            logger.error("Failed to list namespaces: %s", namespace_error)
             return jsonify({
                 "error": "Failed to access Kubernetes cluster",
                 "details": str(namespace_error)
             }), 500
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         return jsonify({
             "error": "Internal server error",
             "details": str(e)
@@ -95,5 +108,10 @@ if __name__ == '__main__':
     is_production = os.getenv('ENVIRONMENT') == 'production'
     default_port = 8000 if is_production else 5000
     port = int(os.getenv('PORT', default_port))
+
+    # Refuse to start in production if the cluster can't be reached
+    if is_production and not KubernetesService.get_instance().health_check():
+        logger.critical("Kubernetes cluster is unreachable; not starting the server")
+        sys.exit(1)
     
     app.run(host='0.0.0.0', port=port)
@@ -1,20 +1,76 @@
-from azure.identity import DefaultAzureCredential, AzureCliCredential
+from azure.identity import ManagedIdentityCredential, AzureCliCredential
 from kubernetes import client, config
 import os
-from kubernetes.utils import create_from_yaml
 from utils.kubernetes_deployment_builder import KubernetesDeploymentBuilder
 import logging
 from azure.mgmt.containerinstance import ContainerInstanceManagementClient
-from jose import jwt  # For decoding and validating JWT tokens
+from azure.mgmt.containerservice import ContainerServiceClient
+import base64
+import json
+import tempfile
+import atexit
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.util.retry import Retry
+import threading
+import functools
+import time
 
 # Set up logging
 logger = logging.getLogger(__name__)
-logging.getLogger('kubernetes').setLevel(logging.DEBUG)
+
+AKS_TOKEN_SCOPE = "https://aks.azure.com/.default"
+AKS_TOKEN_AUDIENCE = "https://aks.azure.com"
+# Keep-alive connections held open to the API server
+CONNECTION_POOL_MAXSIZE = 50
+# Statuses the API server uses when it throttles or sheds load; the request was not applied
+RETRY_STATUSES = (429, 503)
+# Parallel calls in the bulk deploy/scale paths, overridable with K8S_MAX_CONCURRENCY
+DEFAULT_MAX_CONCURRENCY = 20
+# Fetch a new token this many seconds before the cached one expires
+TOKEN_REFRESH_MARGIN = 300
+
+# AAD tokens are valid for about an hour, so share one across the process
+_token_cache = {"token": None, "expires_on": 0}
+_token_lock = threading.Lock()
+
+# PEM file written from the fetched cluster CA; one per process, removed at exit
+_cluster_ca_path = None
+
+def _remove_cluster_ca_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _decode_jwt_claims(token):
+    """
+    Decode the payload of a JWT without verifying it (only used to read 'aud').
+    """
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+def _max_concurrency():
+    """
+    Worker count for bulk operations, read at call time so .env values apply.
+    """
+    return int(os.getenv('K8S_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+
+@functools.lru_cache(maxsize=1)
+def _aci_client(subscription_id):
+    """
+    Build the ACI management client once; it keeps its own credential and HTTP pipeline.
+    """
+    return ContainerInstanceManagementClient(AzureCliCredential(), subscription_id)
+
+# Process-wide service instance, built lazily by KubernetesService.get_instance()
+_instance = None
+_instance_lock = threading.Lock()
 
 class KubernetesService:
     def __init__(self):
         self.environment = os.getenv('ENVIRONMENT', 'development')
-        logger.info(f"Initializing KubernetesService in {self.environment} mode")
+        logger.info("Initializing KubernetesService in %s mode", self.environment)
         
         if self.environment == 'production':
             self._init_aks()
@@ -30,66 +86,157 @@ class KubernetesService:
             self.cluster_name = "gameserverclusterprod"
             self.cluster_url = "https://gameserverclusterprod-dns-o0owfoer.hcp.eastus.azmk8s.io"
             
-            logger.info(f"Using Subscription: {self.subscription_id}")
-            logger.info(f"Resource Group: {self.resource_group}")
-            logger.info(f"Cluster Name: {self.cluster_name}")
+            logger.info("Using Subscription: %s", self.subscription_id)
+            logger.info("Resource Group: %s", self.resource_group)
+            logger.info("Cluster Name: %s", self.cluster_name)
             
-            # Retrieve a token specifically for AKS
-            credential = DefaultAzureCredential()
-            token = credential.get_token("https://aks.azure.com/.default")
-            
-            # Decode and log the token audience for validation
-            decoded_token = jwt.get_unverified_claims(token.token)
-            audience = decoded_token.get("aud", "No Audience Found")
-            logger.info(f"Token audience (aud): {audience}")
-            
-            if audience != "https://aks.azure.com":
-                raise ValueError(f"Incorrect token audience: {audience}. Expected 'https://aks.azure.com'.")
-            
-            logger.info("Token successfully retrieved for AKS.")
+            # Retrieve a token specifically for AKS. Production only runs with a
+            # managed identity, so skip DefaultAzureCredential's chain of probes
+            self.credential = ManagedIdentityCredential(client_id=os.getenv('AZURE_CLIENT_ID'))
+            token = self._get_token()
             
             # Configure Kubernetes client with the retrieved token
             configuration = client.Configuration()
             configuration.host = self.cluster_url
-            configuration.api_key = {"authorization": f"Bearer {token.token}"}
-            configuration.verify_ssl = False
-            
-            client.Configuration.set_default(configuration)
+            configuration.api_key = {"authorization": f"Bearer {token}"}
+            # Swap in a fresh token before each request once the cached one is near expiry
+            configuration.refresh_api_key_hook = self._refresh_api_key
+            # Verify the API server against the cluster's own CA; public bundles can't
+            configuration.verify_ssl = True
+            configuration.ssl_ca_cert = self._cluster_ca_cert()
+            configuration.connection_pool_maxsize = CONNECTION_POOL_MAXSIZE
+            # Back off and retry throttled calls (honouring Retry-After) instead of failing the request.
+            # Read and other errors are never retried: the request may already have been applied
+            configuration.retries = Retry(
+                total=3,
+                read=0,
+                other=0,
+                backoff_factor=0.3,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=None,
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
             
-            # Test connection to the Kubernetes cluster
-            self.core_api = client.CoreV1Api()
-            self.apps_api = client.AppsV1Api()
-            logger.info("Testing cluster connection...")
-            self.core_api.list_namespace()
-            logger.info("Successfully connected to Kubernetes cluster.")
+            # One ApiClient, and so one connection pool, shared by every API group
+            self.api_client = client.ApiClient(configuration)
+            self.core_api = client.CoreV1Api(self.api_client)
+            self.apps_api = client.AppsV1Api(self.api_client)
+            logger.info("Kubernetes client configured for %s", self.cluster_url)
         
         except Exception as e:
-            logger.error(f"Error initializing Kubernetes client: {str(e)}")
+            logger.error("Error initializing Kubernetes client: %s", e)
             raise
     
+    def _cluster_ca_cert(self):
+        """
+        Return the path of a PEM file holding the AKS cluster CA.
+
+        Uses AKS_CA_CERT when set; otherwise reads certificate-authority-data from
+        the cluster user kubeconfig via ARM once per process and writes it to a
+        temp file that is removed at exit.
+        """
+        global _cluster_ca_path
+        ca_path = os.getenv('AKS_CA_CERT')
+        if ca_path:
+            return ca_path
+        if _cluster_ca_path:
+            return _cluster_ca_path
+
+        logger.info("Fetching cluster CA for %s", self.cluster_name)
+        container_client = ContainerServiceClient(self.credential, self.subscription_id)
+        credentials = container_client.managed_clusters.list_cluster_user_credentials(
+            self.resource_group, self.cluster_name
+        )
+        # Older SDKs return the kubeconfig as a bytearray, which yaml can't load directly
+        kubeconfig = yaml.safe_load(bytes(credentials.kubeconfigs[0].value))
+        ca_data = kubeconfig["clusters"][0]["cluster"].get("certificate-authority-data")
+        if not ca_data:
+            raise ValueError(f"No certificate-authority-data in kubeconfig for cluster {self.cluster_name}")
+
+        with tempfile.NamedTemporaryFile("wb", suffix=".pem", delete=False) as ca_file:
+            ca_file.write(base64.b64decode(ca_data))
+        atexit.register(_remove_cluster_ca_file, ca_file.name)
+        _cluster_ca_path = ca_file.name
+        return _cluster_ca_path
+
+    def _get_token(self):
+        """
+        Return an AKS bearer token, reusing the cached one until it is close to expiry.
+        """
+        with _token_lock:
+            if time.time() < _token_cache["expires_on"] - TOKEN_REFRESH_MARGIN:
+                return _token_cache["token"]
+
+            token = self.credential.get_token(AKS_TOKEN_SCOPE)
+            
+            # Decode and log the token audience for validation
+            decoded_token = _decode_jwt_claims(token.token)
+            audience = decoded_token.get("aud", "No Audience Found")
+            logger.info("Token audience (aud): %s", audience)
+            
+            if audience != AKS_TOKEN_AUDIENCE:
+                raise ValueError(f"Incorrect token audience: {audience}. Expected '{AKS_TOKEN_AUDIENCE}'.")
+            
+            logger.info("Token successfully retrieved for AKS.")
+            _token_cache["token"] = token.token
+            _token_cache["expires_on"] = token.expires_on
+            return token.token
+
+    def _refresh_api_key(self, configuration):
+        configuration.api_key["authorization"] = f"Bearer {self._get_token()}"
+
     def _init_aci(self):
         try:
             logger.info("Initializing KubernetesService for ACI...")
-            credential = AzureCliCredential()
-            self.aci_client = ContainerInstanceManagementClient(
-                credential, 
-                self.subscription_id
-            )
+            self.subscription_id = os.getenv('AZURE_SUBSCRIPTION_ID')
+            self.aci_client = _aci_client(self.subscription_id)
             logger.info("Successfully initialized ACI client.")
         except Exception as e:
-            logger.error(f"Failed to initialize ACI: {str(e)}")
+            logger.error("Failed to initialize ACI: %s", e)
             raise
 
+    @classmethod
+    def get_instance(cls):
+        """
+        Return the shared service instance, creating it on first use.
+
+        Building the service fetches a token and sets up the API clients, so it
+        is done once per process instead of once per request.
+        """
+        global _instance
+        if _instance is None:
+            with _instance_lock:
+                if _instance is None:
+                    _instance = cls()
+        return _instance
+
+    def health_check(self):
+        """
+        Check that the cluster is reachable. Meant for startup, not the request path.
+
+        Uses the /version endpoint, which returns a small constant-size response
+        without listing any objects.
+        """
+        try:
+            logger.info("Testing cluster connection...")
+            version = client.VersionApi(self.api_client).get_code()
+            logger.info("Successfully connected to Kubernetes cluster %s.", version.git_version)
+            return True
+        except Exception as e:
+            logger.error("Kubernetes health check failed: %s", e)
+            return False
+
     @classmethod
     def deploy_game_server(cls, server_id, namespace, image, cpu, memory, port, env_vars, volume=None):
         """
         Deploy a game server dynamically using provided parameters.
         """
         try:
-            logger.info(f"Deploying game server with ID: {server_id}")
+            logger.info("Deploying game server with ID: %s", server_id)
             
-            # Create an instance to use the initialized client
-            service = cls()
+            # Reuse the shared instance and its initialized client
+            service = cls.get_instance()
 
             # Generate deployment YAML dynamically
             deployment_yaml = KubernetesDeploymentBuilder.generate_yaml(
@@ -103,10 +250,115 @@ class KubernetesService:
                 volume=volume
             )
 
-            # Apply the deployment using the existing client
-            create_from_yaml(service.core_api.api_client, yaml_objects=[deployment_yaml], namespace=namespace)
-            logger.info(f"Deployment {server_id} applied successfully.")
+            # Create the deployment directly; the builder already returns a plain dict
+            service.apps_api.create_namespaced_deployment(namespace=namespace, body=deployment_yaml)
+            logger.info("Deployment %s applied successfully.", server_id)
         
         except Exception as e:
-            logger.error(f"Failed to deploy game server {server_id}: {str(e)}")
-            raise
\ No newline at end of file
+            logger.error("Failed to deploy game server %s: %s", server_id, e)
+            raise
+
+    @classmethod
+    def deploy_game_servers(cls, specs):
+        """
+        Deploy several game servers concurrently.
+
+        Each spec holds the keyword arguments for deploy_game_server. Deploys run
+        on a bounded thread pool sharing the service's connection pool, so N
+        servers take roughly one round-trip instead of N. Returns a dict mapping
+        each server_id that failed to its error; empty when all succeeded.
+        Raises ValueError if a server_id appears more than once.
+        """
+        if not specs:
+            return {}
+
+        server_ids = [spec["server_id"] for spec in specs]
+        duplicates = sorted({server_id for server_id in server_ids if server_ids.count(server_id) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate server_id in deploy specs: {', '.join(duplicates)}")
+
+        max_workers = _max_concurrency()
+        logger.info("Deploying %d game servers with up to %d in parallel", len(specs), max_workers)
+
+        # Build the shared instance up front so workers don't all wait on the lock
+        cls.get_instance()
+
+        failed = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                spec["server_id"]: executor.submit(cls.deploy_game_server, **spec)
+                for spec in specs
+            }
+            for server_id, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[server_id] = str(e)
+
+        if failed:
+            logger.error("Failed to deploy %d of %d game servers", len(failed), len(specs))
+        return failed
+
+    @classmethod
+    def scale_deployments_bulk(cls, targets, namespace="default"):
+        """
+        Scale many game servers at once, e.g. to pause a batch of idle servers.
+
+        targets maps server_id to the desired replica count. Current replica
+        counts are read with a single LIST instead of one GET per server, and
+        only deployments that exist and need a change are patched, in parallel.
+        Returns (scaled, failed): the list of server IDs that were patched and a
+        dict mapping each server_id that could not be scaled to its error
+        ("not found" when no such deployment exists). Servers already at the
+        target replica count appear in neither.
+        """
+        if not targets:
+            return [], {}
+
+        try:
+            logger.info("Scaling %d game servers in namespace %s", len(targets), namespace)
+
+            service = cls.get_instance()
+
+            deployments = service.apps_api.list_namespaced_deployment(
+                namespace,
+                label_selector=f"app in ({','.join(targets)})"
+            )
+            current = {d.metadata.name: d.spec.replicas for d in deployments.items}
+
+            missing = [name for name in targets if name not in current]
+            if missing:
+                logger.warning("Skipping unknown game servers: %s", missing)
+
+            to_patch = [
+                (name, replicas) for name, replicas in targets.items()
+                if name in current and current[name] != replicas
+            ]
+
+        except Exception as e:
+            logger.error("Failed to scale game servers: %s", e)
+            raise
+
+        scaled = []
+        failed = {name: "not found" for name in missing}
+        with ThreadPoolExecutor(max_workers=_max_concurrency()) as executor:
+            # The pinned client sends PATCH as application/json-patch+json and its
+            # generated methods reject _content_type, so send a JSON Patch op list
+            futures = [
+                (name, executor.submit(
+                    service.apps_api.patch_namespaced_deployment_scale,
+                    name, namespace, [{"op": "replace", "path": "/spec/replicas", "value": replicas}]
+                ))
+                for name, replicas in to_patch
+            ]
+            for name, future in futures:
+                try:
+                    future.result()
+                    scaled.append(name)
+                except Exception as e:
+                    failed[name] = str(e)
+
+        logger.info("Scaled %d game servers successfully.", len(scaled))
+        if failed:
+            logger.error("Failed to scale %d of %d game servers", len(failed), len(targets))
+        return scaled, failed
@@ -1,9 +1,25 @@
+from unittest.mock import MagicMock
 import pytest
+from kubernetes import client as k8s_client
 from app import app
 
-@pytest.fixture
+@pytest.fixture(scope="session", autouse=True)
+def no_cloud_access():
+    """Keep tests off Azure and the cluster even if they build a real KubernetesService"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("services.kubernetes_service.ManagedIdentityCredential", MagicMock)
+        mp.setattr("services.kubernetes_service.AzureCliCredential", MagicMock)
+        mp.setattr("services.kubernetes_service.ContainerInstanceManagementClient", MagicMock)
+        mp.setattr("services.kubernetes_service.ContainerServiceClient", MagicMock)
+        mp.setattr(
+            k8s_client.CoreV1Api,
+            "list_namespace",
+            lambda self, **kwargs: k8s_client.V1NamespaceList(items=[], metadata=k8s_client.V1ListMeta())
+        )
+        yield
+
+@pytest.fixture(scope="session")
 def client():
-    """Create a test client for the app"""
+    """Create one test client for the app, shared by every test"""
     app.config['TESTING'] = True
-    with app.test_client() as client:
-        yield client 
\ No newline at end of file
+    return app.test_client()
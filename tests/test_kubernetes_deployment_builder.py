@@ -0,0 +1,64 @@
+import json
+import yaml
+from utils.kubernetes_deployment_builder import KubernetesDeploymentBuilder
+
+def test_save_to_file_round_trip(tmp_path):
+    """Test that a saved deployment loads back unchanged with its key order kept"""
+    deployment = KubernetesDeploymentBuilder.generate_yaml(
+        deployment_name="test-server",
+        namespace="default",
+        image="test-image:latest",
+        cpu=1000,
+        memory=1024,
+        port=25565,
+        env_vars={"EULA": "TRUE"}
+    )
+    file_path = tmp_path / "deployment.yaml"
+
+    KubernetesDeploymentBuilder.save_to_file(deployment, file_path)
+
+    text = file_path.read_text()
+    assert yaml.safe_load(text) == deployment
+    # Container keys are not in alphabetical order, so sorted output would put image first
+    container_block = text[text.index("containers:"):]
+    assert container_block.index("name: test-server") < container_block.index("image:")
+
+def test_save_to_json_round_trip(tmp_path):
+    """Test that a deployment saved as JSON loads back unchanged"""
+    deployment = KubernetesDeploymentBuilder.generate_yaml(
+        deployment_name="test-server",
+        namespace="default",
+        image="test-image:latest",
+        cpu=1000,
+        memory=1024,
+        port=25565,
+        env_vars={"EULA": "TRUE"}
+    )
+    file_path = tmp_path / "deployment.json"
+
+    KubernetesDeploymentBuilder.save_to_json(deployment, file_path)
+
+    assert json.loads(file_path.read_text()) == deployment
+
+def test_generate_yaml_with_volume():
+    """Test that a volume adds both the container mount and the pod volume"""
+    volume = {
+        "name": "data-volume",
+        "mount_path": "/data",
+        "azure_file": {"secretName": "azure-secret", "shareName": "data", "readOnly": False}
+    }
+
+    deployment = KubernetesDeploymentBuilder.generate_yaml(
+        deployment_name="test-server",
+        namespace="default",
+        image="test-image:latest",
+        cpu=1000,
+        memory=1024,
+        port=25565,
+        env_vars={},
+        volume=volume
+    )
+    pod_spec = deployment["spec"]["template"]["spec"]
+
+    assert pod_spec["containers"][0]["volumeMounts"] == [{"name": "data-volume", "mountPath": "/data"}]
+    assert pod_spec["volumes"] == [{"name": "data-volume", "azureFile": volume["azure_file"]}]
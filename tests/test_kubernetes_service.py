@@ -0,0 +1,243 @@
+import base64
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+import pytest
+from kubernetes.client import AppsV1Api, CoreV1Api
+from services import kubernetes_service
+from services.kubernetes_service import KubernetesService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """KubernetesService with mocked API clients and no cluster connection"""
+    service = KubernetesService.__new__(KubernetesService)
+    service.api_client = Mock()
+    service.core_api = Mock(spec_set=CoreV1Api)
+    service.apps_api = Mock(spec_set=AppsV1Api)
+    monkeypatch.setattr(kubernetes_service, "_instance", service)
+    return service
+
+def test_get_instance_is_cached(monkeypatch):
+    """Test that the service is only constructed once per process"""
+    monkeypatch.setattr(kubernetes_service, "_instance", None)
+    monkeypatch.setattr(KubernetesService, "__init__", lambda self: None)
+
+    first = KubernetesService.get_instance()
+    assert KubernetesService.get_instance() is first
+
+def test_deploy_game_server_creates_deployment(service):
+    """Test that the deployment dict is sent straight to the AppsV1 API"""
+    KubernetesService.deploy_game_server(
+        server_id="test-server",
+        namespace="default",
+        image="test-image:latest",
+        cpu=1000,
+        memory=1024,
+        port=25565,
+        env_vars={"EULA": "TRUE"}
+    )
+
+    service.apps_api.create_namespaced_deployment.assert_called_once()
+    kwargs = service.apps_api.create_namespaced_deployment.call_args.kwargs
+    assert kwargs["namespace"] == "default"
+    assert kwargs["body"]["metadata"]["name"] == "test-server"
+    assert kwargs["body"]["kind"] == "Deployment"
+
+def test_deploy_game_servers_rejects_duplicate_ids(service):
+    """Test that a repeated server_id is rejected before anything is deployed"""
+    spec = {"namespace": "default", "image": "test-image:latest", "cpu": 1000,
+            "memory": 1024, "port": 25565, "env_vars": {}}
+
+    with pytest.raises(ValueError):
+        KubernetesService.deploy_game_servers([
+            dict(spec, server_id="server-a"),
+            dict(spec, server_id="server-a"),
+        ])
+    service.apps_api.create_namespaced_deployment.assert_not_called()
+
+def test_scale_deployments_bulk_lists_once_and_patches_changes(service):
+    """Test that bulk scaling uses one LIST and only patches what changed"""
+    deployment = lambda name, replicas: SimpleNamespace(
+        metadata=SimpleNamespace(name=name), spec=SimpleNamespace(replicas=replicas)
+    )
+    service.apps_api.list_namespaced_deployment.return_value.items = [
+        deployment("server-a", 1),
+        deployment("server-b", 0),
+    ]
+
+    scaled, failed = KubernetesService.scale_deployments_bulk(
+        {"server-a": 0, "server-b": 0, "server-c": 0}
+    )
+
+    assert scaled == ["server-a"]
+    assert failed == {"server-c": "not found"}
+    service.apps_api.list_namespaced_deployment.assert_called_once_with(
+        "default", label_selector="app in (server-a,server-b,server-c)"
+    )
+    service.apps_api.patch_namespaced_deployment_scale.assert_called_once_with(
+        "server-a", "default", [{"op": "replace", "path": "/spec/replicas", "value": 0}]
+    )
+
+def test_scale_patch_body_matches_selected_content_type(monkeypatch):
+    """Test that the real client sends the scale body as a JSON Patch list"""
+    apps_api = AppsV1Api(kubernetes_service.client.ApiClient())
+    request = Mock()
+    monkeypatch.setattr(apps_api.api_client.rest_client.pool_manager, "request", request)
+    monkeypatch.setattr(apps_api.api_client, "deserialize", lambda *args: None)
+    service = KubernetesService.__new__(KubernetesService)
+    service.apps_api = apps_api
+    monkeypatch.setattr(kubernetes_service, "_instance", service)
+    monkeypatch.setattr(
+        apps_api, "list_namespaced_deployment",
+        lambda *args, **kwargs: SimpleNamespace(items=[
+            SimpleNamespace(metadata=SimpleNamespace(name="server-a"), spec=SimpleNamespace(replicas=1))
+        ])
+    )
+    request.return_value = Mock(status=200, data=b"{}", reason="OK", getheaders=lambda: {})
+
+    scaled, failed = KubernetesService.scale_deployments_bulk({"server-a": 0})
+
+    assert (scaled, failed) == (["server-a"], {})
+    kwargs = request.call_args.kwargs
+    assert kwargs["headers"]["Content-Type"] == "application/json-patch+json"
+    assert json.loads(kwargs["body"]) == [{"op": "replace", "path": "/spec/replicas", "value": 0}]
+
+def test_scale_deployments_bulk_reports_failures(service):
+    """Test that one failed patch doesn't hide the servers that were scaled"""
+    service.apps_api.list_namespaced_deployment.return_value.items = [
+        SimpleNamespace(metadata=SimpleNamespace(name=name), spec=SimpleNamespace(replicas=1))
+        for name in ("server-a", "server-b", "server-c")
+    ]
+    def patch(name, namespace, body):
+        if name == "server-b":
+            raise RuntimeError("conflict")
+    service.apps_api.patch_namespaced_deployment_scale.side_effect = patch
+
+    scaled, failed = KubernetesService.scale_deployments_bulk(
+        {"server-a": 0, "server-b": 0, "server-c": 0}
+    )
+
+    assert scaled == ["server-a", "server-c"]
+    assert failed == {"server-b": "conflict"}
+
+def _fake_token(audience, expires_on):
+    """Build an unsigned JWT wrapped like azure.core's AccessToken"""
+    encode = lambda data: base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    token = ".".join([encode({"alg": "none"}), encode({"aud": audience}), "c2ln"])
+    return Mock(token=token, expires_on=expires_on)
+
+def test_init_aks_configures_shared_client(monkeypatch):
+    """Test the AKS client settings without fetching a token or contacting the cluster"""
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    monkeypatch.setenv("AKS_CA_CERT", "/etc/ssl/aks-ca.pem")
+    monkeypatch.setattr(kubernetes_service, "_token_cache", {"token": "cached", "expires_on": time.time() + 3600})
+
+    service = KubernetesService()
+    configuration = service.api_client.configuration
+
+    assert service.core_api.api_client is service.apps_api.api_client
+    assert configuration.api_key == {"authorization": "Bearer cached"}
+    assert configuration.verify_ssl is True
+    assert configuration.ssl_ca_cert == "/etc/ssl/aks-ca.pem"
+    assert configuration.connection_pool_maxsize == 50
+    assert set(configuration.retries.status_forcelist) == {429, 503}
+    assert configuration.retries.respect_retry_after_header is True
+    assert configuration.retries.read == 0
+    assert configuration.retries.other == 0
+
+def test_cluster_ca_cert_fetched_from_cluster_credentials(service, monkeypatch):
+    """Test that without AKS_CA_CERT the CA is read from the cluster user kubeconfig"""
+    monkeypatch.delenv("AKS_CA_CERT", raising=False)
+    kubeconfig = "clusters:\n- cluster:\n    certificate-authority-data: %s\n" % base64.b64encode(b"PEM").decode()
+    container_client = Mock()
+    container_client.managed_clusters.list_cluster_user_credentials.return_value = Mock(
+        kubeconfigs=[Mock(value=bytearray(kubeconfig.encode()))]
+    )
+    monkeypatch.setattr(kubernetes_service, "ContainerServiceClient", Mock(return_value=container_client))
+    monkeypatch.setattr(kubernetes_service, "_cluster_ca_path", None)
+    service.credential = Mock()
+    service.subscription_id = "sub"
+    service.resource_group = "rg"
+    service.cluster_name = "cluster"
+
+    ca_path = service._cluster_ca_cert()
+
+    with open(ca_path, "rb") as ca_file:
+        assert ca_file.read() == b"PEM"
+    assert service._cluster_ca_cert() == ca_path
+    kubernetes_service._remove_cluster_ca_file(ca_path)
+    container_client.managed_clusters.list_cluster_user_credentials.assert_called_once_with("rg", "cluster")
+
+def test_cluster_ca_cert_missing_fails_fast(service, monkeypatch):
+    """Test that a kubeconfig without a CA raises instead of disabling verification"""
+    monkeypatch.delenv("AKS_CA_CERT", raising=False)
+    container_client = Mock()
+    container_client.managed_clusters.list_cluster_user_credentials.return_value = Mock(
+        kubeconfigs=[Mock(value=b"clusters:\n- cluster:\n    server: https://example\n")]
+    )
+    monkeypatch.setattr(kubernetes_service, "ContainerServiceClient", Mock(return_value=container_client))
+    monkeypatch.setattr(kubernetes_service, "_cluster_ca_path", None)
+    service.credential = Mock()
+    service.subscription_id = "sub"
+    service.resource_group = "rg"
+    service.cluster_name = "cluster"
+
+    with pytest.raises(ValueError):
+        service._cluster_ca_cert()
+
+def test_get_token_reuses_cached_token(service, monkeypatch):
+    """Test that a valid token is fetched once and then served from the cache"""
+    monkeypatch.setattr(kubernetes_service, "_token_cache", {"token": None, "expires_on": 0})
+    service.credential = Mock()
+    service.credential.get_token.return_value = _fake_token("https://aks.azure.com", time.time() + 3600)
+
+    first = service._get_token()
+    assert service._get_token() == first
+    service.credential.get_token.assert_called_once_with("https://aks.azure.com/.default")
+
+def test_get_token_refreshes_near_expiry(service, monkeypatch):
+    """Test that a token inside the refresh margin is replaced"""
+    monkeypatch.setattr(kubernetes_service, "_token_cache", {"token": "old", "expires_on": time.time() + 60})
+    service.credential = Mock()
+    service.credential.get_token.return_value = _fake_token("https://aks.azure.com", time.time() + 3600)
+
+    assert service._get_token() != "old"
+    service.credential.get_token.assert_called_once()
+
+def test_get_token_rejects_wrong_audience(service, monkeypatch):
+    """Test that tokens for another audience are not cached or used"""
+    monkeypatch.setattr(kubernetes_service, "_token_cache", {"token": None, "expires_on": 0})
+    service.credential = Mock()
+    service.credential.get_token.return_value = _fake_token("https://management.azure.com", time.time() + 3600)
+
+    with pytest.raises(ValueError):
+        service._get_token()
+    assert kubernetes_service._token_cache["token"] is None
+
+def test_health_check_uses_version_endpoint(service, monkeypatch):
+    """Test that the health check hits /version rather than listing namespaces"""
+    version_api = Mock()
+    monkeypatch.setattr(kubernetes_service.client, "VersionApi", Mock(return_value=version_api))
+
+    assert service.health_check() is True
+    version_api.get_code.assert_called_once()
+    service.core_api.list_namespace.assert_not_called()
+
+def test_deploy_game_servers_reports_failures(service):
+    """Test that bulk deploys run every spec and return only the failures"""
+    def create(namespace, body):
+        if body["metadata"]["name"] == "server-b":
+            raise RuntimeError("quota exceeded")
+    service.apps_api.create_namespaced_deployment.side_effect = create
+    spec = {"namespace": "default", "image": "test-image:latest", "cpu": 1000,
+            "memory": 1024, "port": 25565, "env_vars": {}}
+
+    failed = KubernetesService.deploy_game_servers([
+        dict(spec, server_id="server-a"),
+        dict(spec, server_id="server-b"),
+    ])
+
+    assert failed == {"server-b": "quota exceeded"}
+    assert service.apps_api.create_namespaced_deployment.call_count == 2
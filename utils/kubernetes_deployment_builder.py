@@ -1,34 +1,49 @@
+import json
 import yaml
 
+# Use the libyaml C emitter when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 class KubernetesDeploymentBuilder:
     @staticmethod
     def generate_yaml(deployment_name, namespace, image, cpu, memory, port, env_vars, volume=None):
         """
         Generate Kubernetes Deployment YAML dynamically.
         """
+        # Format each quantity once; requests and limits share the same strings
+        cpu_str = f"{cpu}m"  # CPU in millicores
+        mem_str = f"{memory}Mi"  # Memory in MiB
+        env_list = [{"name": k, "value": v} for k, v in env_vars.items()]
+
+        # Optional volume entries, merged into the literals below so each dict is built in one pass
+        if volume:
+            mount_spec = {"volumeMounts": [{"name": volume["name"], "mountPath": volume["mount_path"]}]}
+            volume_spec = {"volumes": [{"name": volume["name"], "azureFile": volume["azure_file"]}]}
+        else:
+            mount_spec = volume_spec = {}
+
         container_spec = {
             "name": deployment_name,
             "image": image,
             "resources": {
                 "requests": {
-                    "cpu": f"{cpu}m",  # Convert cores to millicores
-                    "memory": f"{memory}Mi"  # Convert GB to MiB
+                    "cpu": cpu_str,
+                    "memory": mem_str
                 },
                 "limits": {
-                    "cpu": f"{cpu}m",
-                    "memory": f"{memory}Mi"
+                    "cpu": cpu_str,
+                    "memory": mem_str
                 }
             },
             "ports": [{"containerPort": port}],
-            "env": [{"name": k, "value": v} for k, v in env_vars.items()],
+            "env": env_list,
+            **mount_spec,
         }
 
-        if volume:
-            container_spec["volumeMounts"] = [
-                {"name": volume["name"], "mountPath": volume["mount_path"]}
-            ]
-
-        deployment = {
+        return {
             "apiVersion": "apps/v1",
             "kind": "Deployment",
             "metadata": {
@@ -50,22 +65,26 @@ class KubernetesDeploymentBuilder:
                     },
                     "spec": {
                         "containers": [container_spec],
+                        **volume_spec,
                     }
                 }
             }
         }
 
-        if volume:
-            deployment["spec"]["template"]["spec"]["volumes"] = [
-                {"name": volume["name"], "azureFile": volume["azure_file"]}
-            ]
-
-        return deployment
-
     @staticmethod
     def save_to_file(data, file_path):
         """
         Save YAML data to a file (optional for debugging).
         """
+        # Render to a string first so the file gets one write instead of one per YAML event
+        text = yaml.dump(data, Dumper=YamlDumper, default_flow_style=False, sort_keys=False)
+        with open(file_path, "w") as file:
+            file.write(text)
+
+    @staticmethod
+    def save_to_json(data, file_path):
+        """
+        Save data to a compact JSON file; kubectl accepts it the same as YAML.
+        """
         with open(file_path, "w") as file:
-            yaml.dump(data, file)
+            json.dump(data, file, separators=(",", ":"))